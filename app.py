@@ -2,35 +2,112 @@
 Field Site Visit App
 Mobile-friendly Flask app for collecting site visit data
 """
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, session
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, redirect, url_for, session, g, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
+from flask_caching import Cache
 from werkzeug.security import generate_password_hash, check_password_hash
-from functools import wraps
+from functools import wraps, lru_cache
 import os
-import json
+import io
+import time
+import threading
+import secrets
 from datetime import datetime
 from pathlib import Path
-import base64
+import pybase64
+from decimal import Decimal
+import orjson
+import msgpack
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 
 # Load .env file (for local development)
 load_dotenv()
 
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson (much faster than stdlib json on big payloads)"""
+    # Compact, unsorted output - smaller responses over cellular
+    sort_keys = False
+    compact = True
+
+    @staticmethod
+    def _default(o):
+        # psycopg2 returns DECIMAL columns as Decimal - send them as numbers
+        if isinstance(o, Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self._default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 CORS(app)
 
+# Compress JSON/HTML/JS responses - brotli where the browser supports it, else gzip
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_BR_LEVEL'] = 5
+app.config['COMPRESS_LEVEL'] = 5
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
+
+# Only cache with a backend all gunicorn workers share (CACHE_TYPE=RedisCache +
+# CACHE_REDIS_URL) - a per-worker cache would keep serving stale project lists
+# after another worker handled the write. Without one, caching is a no-op
+# (on purpose, so Flask-Caching's NullCache warning is silenced).
+cache = Cache(app, config={
+    'CACHE_TYPE': os.environ.get('CACHE_TYPE', 'NullCache'),
+    'CACHE_NO_NULL_WARNING': True,
+    'CACHE_REDIS_URL': os.environ.get('CACHE_REDIS_URL'),
+    'CACHE_DEFAULT_TIMEOUT': 30
+})
+
 # Database connection
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Created on first use inside each gunicorn worker, never before the fork,
+# so workers don't share sockets. psycopg2 closes any returned connection
+# beyond minconn, so keep one open per worker thread (--threads in Procfile).
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+db_pool = None
+db_pool_lock = threading.Lock()
+
+def get_pool():
+    """Get the connection pool, creating it on first use"""
+    global db_pool
+    if db_pool is None:
+        with db_pool_lock:
+            if db_pool is None:
+                db_pool = ThreadedConnectionPool(DB_POOL_SIZE, DB_POOL_SIZE, DATABASE_URL)
+    return db_pool
+
 def get_db():
-    """Get database connection"""
+    """Get a pooled database connection for the current request"""
     if not DATABASE_URL:
         return None
-    conn = psycopg2.connect(DATABASE_URL)
-    return conn
+    if 'db' not in g:
+        g.db = get_pool().getconn()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exc):
+    """Return the request's connection to the pool"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().putconn(conn)
 
 def init_db():
     """Initialize database tables"""
@@ -38,9 +115,13 @@ def init_db():
         print("No DATABASE_URL - using file storage")
         return
     
-    conn = get_db()
+    # Runs at import, so use a one-off connection rather than the pool
+    conn = psycopg2.connect(DATABASE_URL)
     cur = conn.cursor()
     
+    # Every gunicorn worker runs this - take turns so schema changes never race
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('field-app init_db'))")
+    
     # Create projects table
     cur.execute('''
         CREATE TABLE IF NOT EXISTS projects (
@@ -83,22 +164,32 @@ def init_db():
             project_id VARCHAR(50) REFERENCES projects(id) ON DELETE CASCADE,
             label VARCHAR(255),
             filename VARCHAR(255),
-            data TEXT,
+            data BYTEA,
+            storage_url VARCHAR(255),
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    cur.execute('ALTER TABLE photos ADD COLUMN IF NOT EXISTS storage_url VARCHAR(255)')
+    
+    # Migrate photos stored as base64 TEXT to raw BYTEA
+    cur.execute('''
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'photos' AND column_name = 'data'
+    ''')
+    column = cur.fetchone()
+    if column and column[0] == 'text':
+        cur.execute("ALTER TABLE photos ALTER COLUMN data TYPE BYTEA USING decode(data, 'base64')")
+    
+    # Indexes for the per-user project list and per-project lookups
+    cur.execute('CREATE INDEX IF NOT EXISTS projects_user_created_idx ON projects(user_email, created_at DESC)')
+    cur.execute('CREATE INDEX IF NOT EXISTS gps_project_idx ON gps_points(project_id, created_at)')
+    cur.execute('CREATE INDEX IF NOT EXISTS photos_project_idx ON photos(project_id, created_at)')
     
     conn.commit()
     cur.close()
     conn.close()
     print("Database initialized!")
 
-# Initialize database on startup
-try:
-    init_db()
-except Exception as e:
-    print(f"Database init error: {e}")
-
 # Authentication - users stored in environment or defaults
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'kyle@trilakes.co').lower().strip()
 ADMIN_PASSWORD = str(os.environ.get('ADMIN_PASSWORD', 'changeme'))
@@ -108,11 +199,21 @@ print(f"[Auth] Password length: {len(ADMIN_PASSWORD)}")
 
 USERS = {
     ADMIN_EMAIL: {
-        'password_hash': generate_password_hash(ADMIN_PASSWORD),
+        'password': ADMIN_PASSWORD,
         'name': 'Kyle'
     }
 }
 
+@lru_cache(maxsize=None)
+def password_hash(email):
+    """Password hash for a user, computed once per worker on first login"""
+    return generate_password_hash(USERS[email]['password'])
+
+@lru_cache(maxsize=1)
+def dummy_password_hash():
+    """Hash checked for unknown emails so failed logins take the same time"""
+    return generate_password_hash('')
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -125,10 +226,97 @@ def login_required(f):
 BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / "data"
 PROJECTS_DIR = DATA_DIR / "projects"
-PHOTOS_DIR = DATA_DIR / "photos"
+PHOTOS_DIR = Path(os.environ.get('PHOTOS_DIR') or DATA_DIR / "photos")
+# With a database, photo bytes stay in the photos table unless PHOTOS_DIR is
+# explicitly set to persistent storage - the default data/photos is wiped on
+# every deploy on hosts like Render
+PHOTOS_IN_DB = bool(DATABASE_URL) and not os.environ.get('PHOTOS_DIR')
 PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
 PHOTOS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Behind nginx, set PHOTOS_ACCEL_PREFIX (e.g. '/_photos/') and add
+#   location /_photos/ { internal; alias /app/data/photos/; }
+# so nginx sends photo files itself instead of streaming them through Python
+PHOTOS_ACCEL_PREFIX = os.environ.get('PHOTOS_ACCEL_PREFIX')
+
+# Initialize database on startup
+try:
+    init_db()
+except Exception as e:
+    print(f"Database init error: {e}")
+
+def new_id():
+    """Time-ordered unique ID: nanosecond clock plus random bits, so requests
+    landing in the same instant (or on different workers) never collide"""
+    return f"{time.time_ns():x}{secrets.token_hex(4)}"
+
+# GPS points and photo metadata are appended to per-project JSON Lines
+# sidecars ({id}.gps.jsonl, {id}.photos.jsonl) instead of rewriting the
+# whole project file, and merged back in when the project is read.
+def sidecar_path(project_id, kind):
+    """Path of a project's 'gps' or 'photos' sidecar"""
+    return PROJECTS_DIR / f"{project_id}.{kind}.jsonl"
+
+def append_record(path, record):
+    """Append one record to a JSON Lines file"""
+    with open(path, 'ab') as f:
+        f.write(orjson.dumps(record) + b'\n')
+
+def append_records(path, records):
+    """Append several records to a JSON Lines file in one write"""
+    with open(path, 'ab') as f:
+        f.write(b''.join(orjson.dumps(r) + b'\n' for r in records))
+
+def write_records(path, records):
+    """Replace the contents of a JSON Lines file"""
+    with open(path, 'wb') as f:
+        f.writelines(orjson.dumps(r) + b'\n' for r in records)
+
+def read_records(path):
+    """Read all records from a JSON Lines file"""
+    if not path.exists():
+        return []
+    with open(path, 'rb') as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+def count_records(path):
+    """Count records in a JSON Lines file without parsing them"""
+    if not path.exists():
+        return 0
+    with open(path, 'rb') as f:
+        return sum(1 for line in f if line.strip())
+
+def gps_sidecar(project_id):
+    """GPS sidecar to append to; points still embedded in an older project file
+    are moved into it first, so its line count is the project's point count"""
+    path = sidecar_path(project_id, 'gps')
+    if not path.exists():
+        project_file = PROJECTS_DIR / f"{project_id}.json"
+        project = orjson.loads(project_file.read_bytes())
+        # Write the moved points to a temp file and link it into place: the link
+        # fails if a concurrent request created the sidecar first, so an
+        # existing sidecar (and anything appended to it) is never truncated
+        tmp = path.with_name(f"{path.name}.{new_id()}.tmp")
+        write_records(tmp, project.get('gps_points', []))
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        else:
+            project['gps_points'] = []
+            with open(project_file, 'wb') as f:
+                f.write(orjson.dumps(project))
+        finally:
+            tmp.unlink()
+    return path
+
+def load_project_file(project_id):
+    """Load a project file with its GPS and photo sidecars merged in"""
+    project = orjson.loads((PROJECTS_DIR / f"{project_id}.json").read_bytes())
+    project['gps_points'] = project.get('gps_points', []) + read_records(sidecar_path(project_id, 'gps'))
+    project['photos'] = project.get('photos', []) + read_records(sidecar_path(project_id, 'photos'))
+    return project
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page"""
@@ -136,12 +324,20 @@ def login():
         email = request.form.get('email', '').lower().strip()
         password = str(request.form.get('password', ''))
         
+        user = USERS.get(email)
+        
         print(f"[Auth] Login attempt: {email}")
-        print(f"[Auth] Email in USERS: {email in USERS}")
+        print(f"[Auth] Email in USERS: {user is not None}")
         
-        if email in USERS and check_password_hash(USERS[email]['password_hash'], password):
+        if user is not None:
+            valid = check_password_hash(password_hash(email), password)
+        else:
+            check_password_hash(dummy_password_hash(), password)
+            valid = False
+        
+        if valid:
             session['user'] = email
-            session['name'] = USERS[email]['name']
+            session['name'] = user['name']
             print(f"[Auth] Login successful for {email}")
             return redirect(url_for('index'))
         else:
@@ -173,8 +369,13 @@ def visit(project_id):
     """Site visit form for a specific project"""
     return render_template('visit.html', project_id=project_id)
 
+def project_list_key():
+    """Cache key for the current user's project list"""
+    return f"proj_list:{session.get('user')}"
+
 @app.route('/api/projects', methods=['GET'])
 @login_required
+@cache.cached(timeout=30, key_prefix=project_list_key)
 def list_projects():
     """List all projects for current user"""
     user_email = session.get('user')
@@ -188,21 +389,23 @@ def list_projects():
         ''', (user_email,))
         projects = cur.fetchall()
         cur.close()
-        conn.close()
         return jsonify([dict(p) for p in projects])
     else:
-        # Fallback to file storage
+        # Fallback to file storage - hot names bound locally for the loop
+        loads = orjson.loads
         projects = []
+        append = projects.append
         for f in PROJECTS_DIR.glob('*.json'):
-            with open(f) as file:
-                data = json.load(file)
-                projects.append({
-                    'id': f.stem,
-                    'address': data.get('property', {}).get('address', 'Unknown'),
-                    'client': data.get('property', {}).get('client', 'Unknown'),
-                    'created': data.get('created', ''),
-                    'status': data.get('status', 'pending')
-                })
+            data = loads(f.read_bytes())
+            get = data.get
+            prop = get('property') or {}
+            append({
+                'id': f.stem,
+                'address': prop.get('address', 'Unknown'),
+                'client': prop.get('client', 'Unknown'),
+                'created': get('created', ''),
+                'status': get('status', 'pending')
+            })
         return jsonify(projects)
 
 @app.route('/api/projects', methods=['POST'])
@@ -212,7 +415,7 @@ def create_project():
     user_email = session.get('user')
     data = request.json
     prop = data.get('property', {})
-    project_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    project_id = new_id()
     
     if DATABASE_URL:
         conn = get_db()
@@ -231,7 +434,6 @@ def create_project():
         ))
         conn.commit()
         cur.close()
-        conn.close()
     else:
         # Fallback to file storage
         project = {
@@ -245,11 +447,58 @@ def create_project():
             'notes': ''
         }
         project_file = PROJECTS_DIR / f"{project_id}.json"
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        with open(project_file, 'wb') as f:
+            f.write(orjson.dumps(project))
     
+    cache.delete(project_list_key())
     return jsonify({'success': True, 'project_id': project_id})
 
+def load_project_doc(project_id, user_email):
+    """Build the project document (project + GPS points + photo metadata) as JSON
+    text in a single query, or return None if the project doesn't exist"""
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT jsonb_build_object(
+            'id', p.id,
+            'status', p.status,
+            'property', jsonb_build_object(
+                'address', p.address,
+                'parcel_id', p.parcel_id,
+                'client', p.client_name,
+                'client_phone', p.client_phone,
+                'acres', p.acres::float8,
+                'center_lat', 39.160840,  -- Default, could store in DB
+                'center_lon', -104.932185
+            ),
+            'visit_data', COALESCE(p.visit_data, '{}'::jsonb),
+            'gps_points', COALESCE((
+                SELECT jsonb_agg(gp ORDER BY gp.created_at)
+                FROM gps_points gp WHERE gp.project_id = p.id
+            ), '[]'::jsonb),
+            'photos', COALESCE((
+                SELECT jsonb_agg(ph ORDER BY ph.created_at)
+                FROM (
+                    SELECT id, project_id, label, filename, storage_url, created_at
+                    FROM photos WHERE project_id = p.id
+                ) ph
+            ), '[]'::jsonb),
+            'notes', COALESCE(p.notes, '')
+        )::text
+        FROM projects p WHERE p.id = %s AND p.user_email = %s
+    ''', (project_id, user_email))
+    row = cur.fetchone()
+    cur.close()
+    return row[0] if row else None
+
+def wants_msgpack():
+    """True if the client asked for MessagePack instead of JSON"""
+    return request.accept_mimetypes.best == 'application/msgpack'
+
+def msgpack_response(obj):
+    """Encode a response body as MessagePack"""
+    return app.response_class(msgpack.packb(obj, use_bin_type=True), mimetype='application/msgpack')
+
 @app.route('/api/projects/<project_id>', methods=['GET'])
 @login_required
 def get_project(project_id):
@@ -257,53 +506,29 @@ def get_project(project_id):
     user_email = session.get('user')
     
     if DATABASE_URL:
-        conn = get_db()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get project
-        cur.execute('SELECT * FROM projects WHERE id = %s AND user_email = %s', (project_id, user_email))
-        project = cur.fetchone()
+        # Photo bytes are served separately by serve_photo
+        doc = load_project_doc(project_id, user_email)
         
-        if not project:
-            cur.close()
-            conn.close()
+        if doc is None:
             return jsonify({'error': 'Project not found'}), 404
         
-        # Get GPS points
-        cur.execute('SELECT * FROM gps_points WHERE project_id = %s ORDER BY created_at', (project_id,))
-        gps_points = cur.fetchall()
-        
-        # Get photos
-        cur.execute('SELECT * FROM photos WHERE project_id = %s ORDER BY created_at', (project_id,))
-        photos = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        return jsonify({
-            'id': project['id'],
-            'status': project['status'],
-            'property': {
-                'address': project['address'],
-                'parcel_id': project['parcel_id'],
-                'client': project['client_name'],
-                'client_phone': project['client_phone'],
-                'acres': float(project['acres']) if project['acres'] else None,
-                'center_lat': 39.160840,  # Default, could store in DB
-                'center_lon': -104.932185
-            },
-            'visit_data': project['visit_data'] or {},
-            'gps_points': [dict(p) for p in gps_points],
-            'photos': [dict(p) for p in photos],
-            'notes': project['notes'] or ''
-        })
+        if wants_msgpack():
+            response = msgpack_response(orjson.loads(doc))
+        else:
+            response = app.response_class(doc, mimetype='application/json')
     else:
         # Fallback to file storage
         project_file = PROJECTS_DIR / f"{project_id}.json"
         if not project_file.exists():
             return jsonify({'error': 'Project not found'}), 404
-        with open(project_file) as f:
-            return jsonify(json.load(f))
+        project = load_project_file(project_id)
+        response = msgpack_response(project) if wants_msgpack() else jsonify(project)
+    
+    # Either format can come back from this URL
+    response.vary.add('Accept')
+    # ETag is a hash of the body - an unchanged project comes back as an empty 304
+    response.add_etag()
+    return response.make_conditional(request)
 
 @app.route('/api/projects/<project_id>', methods=['PUT'])
 @login_required
@@ -318,18 +543,23 @@ def update_project(project_id):
         cur.execute('''
             UPDATE projects SET visit_data = %s, notes = %s, updated_at = CURRENT_TIMESTAMP
             WHERE id = %s AND user_email = %s
-        ''', (json.dumps(data.get('visit_data', {})), data.get('notes', ''), project_id, user_email))
+        ''', (orjson.dumps(data.get('visit_data', {})).decode(), data.get('notes', ''), project_id, user_email))
         conn.commit()
         cur.close()
-        conn.close()
     else:
         project_file = PROJECTS_DIR / f"{project_id}.json"
         if not project_file.exists():
             return jsonify({'error': 'Project not found'}), 404
         data['updated'] = datetime.now().isoformat()
-        with open(project_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        # The client sends the full point/photo lists; keep them in the sidecars
+        write_records(sidecar_path(project_id, 'gps'), data.get('gps_points', []))
+        write_records(sidecar_path(project_id, 'photos'), data.get('photos', []))
+        data['gps_points'] = []
+        data['photos'] = []
+        with open(project_file, 'wb') as f:
+            f.write(orjson.dumps(data))
     
+    cache.delete(project_list_key())
     return jsonify({'success': True})
 
 @app.route('/api/projects/<project_id>/gps', methods=['POST'])
@@ -358,87 +588,239 @@ def add_gps_point(project_id):
         cur.execute('SELECT COUNT(*) FROM gps_points WHERE project_id = %s', (project_id,))
         count = cur.fetchone()[0]
         cur.close()
-        conn.close()
         return jsonify({'success': True, 'point_count': count})
     else:
         project_file = PROJECTS_DIR / f"{project_id}.json"
         if not project_file.exists():
             return jsonify({'error': 'Project not found'}), 404
-        with open(project_file) as f:
-            project = json.load(f)
         gps_data['timestamp'] = datetime.now().isoformat()
-        project['gps_points'].append(gps_data)
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
-        return jsonify({'success': True, 'point_count': len(project['gps_points'])})
+        gps_file = gps_sidecar(project_id)
+        append_record(gps_file, gps_data)
+        return jsonify({'success': True, 'point_count': count_records(gps_file)})
 
-@app.route('/api/projects/<project_id>/photo', methods=['POST'])
+@app.route('/api/projects/<project_id>/gps/batch', methods=['POST'])
 @login_required
-def add_photo(project_id):
-    """Add a photo to project"""
-    data = request.json
-    photo_data = data.get('photo')  # Base64 encoded
-    label = data.get('label', 'Photo')
+def add_gps_points(project_id):
+    """Add several GPS points to project in one request"""
+    body = request.get_json(silent=True)
+    points = body.get('points') if isinstance(body, dict) else None
     
-    if not photo_data:
-        return jsonify({'error': 'No photo data'}), 400
+    if not isinstance(points, list) or not all(isinstance(p, dict) for p in points):
+        return jsonify({'error': 'Expected a list of points'}), 400
     
-    photo_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    if DATABASE_URL:
+        conn = get_db()
+        cur = conn.cursor()
+        if points:
+            execute_values(cur, '''
+                INSERT INTO gps_points (project_id, label, lat, lon, altitude_m, elevation_ft, accuracy, point_type)
+                VALUES %s
+            ''', [(
+                project_id,
+                p.get('label'),
+                p.get('lat'),
+                p.get('lon'),
+                p.get('altitude_m'),
+                p.get('elevation_ft'),
+                p.get('accuracy'),
+                p.get('type')
+            ) for p in points], page_size=200)
+            conn.commit()
+        cur.execute('SELECT COUNT(*) FROM gps_points WHERE project_id = %s', (project_id,))
+        count = cur.fetchone()[0]
+        cur.close()
+        return jsonify({'success': True, 'point_count': count})
+    else:
+        project_file = PROJECTS_DIR / f"{project_id}.json"
+        if not project_file.exists():
+            return jsonify({'error': 'Project not found'}), 404
+        timestamp = datetime.now().isoformat()
+        for p in points:
+            p['timestamp'] = timestamp
+        gps_file = gps_sidecar(project_id)
+        append_records(gps_file, points)
+        return jsonify({'success': True, 'point_count': count_records(gps_file)})
+
+@app.route('/api/projects/<project_id>/photo', methods=['POST'])
+@login_required
+def add_photo(project_id):
+    """Add a photo to project - a multipart JPEG upload, or base64 in JSON
+    (still sent by older offline sync queues)"""
+    photo_id = new_id()
+    photo_filename = f"{project_id}_{photo_id}.jpg"
+    photo_path = PHOTOS_DIR / photo_filename
     
-    # Strip base64 header if present
-    if ',' in photo_data:
-        photo_data = photo_data.split(',')[1]
+    upload = request.files.get('photo')
+    if upload:
+        label = request.form.get('label', 'Photo')
+        try:
+            gps = orjson.loads(request.form.get('gps') or 'null') or {}
+        except ValueError:
+            return jsonify({'error': 'Invalid GPS data'}), 400
+        if PHOTOS_IN_DB:
+            photo_bytes = upload.read()
+        else:
+            upload.save(photo_path)
+    else:
+        # A multipart form without a photo part, or any other body, lands here
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
+        photo_data = data.get('photo')  # Base64 encoded
+        label = data.get('label', 'Photo')
+        gps = data.get('gps', {})
+        
+        if not photo_data or not isinstance(photo_data, str):
+            return jsonify({'error': 'No photo data'}), 400
+        
+        # Strip the data URL header if present - only the prefix is inspected, so
+        # raw base64 isn't scanned or split into copies before decoding
+        if photo_data.startswith('data:'):
+            photo_data = photo_data[photo_data.find(',') + 1:]
+        try:
+            photo_bytes = pybase64.b64decode(photo_data, validate=True)
+        except ValueError:
+            return jsonify({'error': 'Invalid photo data'}), 400
+        
+        if not PHOTOS_IN_DB:
+            with open(photo_path, 'wb') as f:
+                f.write(photo_bytes)
     
     if DATABASE_URL:
         conn = get_db()
         cur = conn.cursor()
         cur.execute('''
-            INSERT INTO photos (project_id, label, filename, data)
-            VALUES (%s, %s, %s, %s)
-        ''', (project_id, label, f"{photo_id}.jpg", photo_data))
+            INSERT INTO photos (project_id, label, filename, storage_url, data)
+            VALUES (%s, %s, %s, %s, %s)
+        ''', (
+            project_id,
+            label,
+            photo_filename,
+            f"/photos/{photo_filename}",
+            psycopg2.Binary(photo_bytes) if PHOTOS_IN_DB else None
+        ))
         conn.commit()
         cur.close()
-        conn.close()
     else:
-        photo_filename = f"{project_id}_{photo_id}.jpg"
-        photo_path = PHOTOS_DIR / photo_filename
-        with open(photo_path, 'wb') as f:
-            f.write(base64.b64decode(photo_data))
-        
         project_file = PROJECTS_DIR / f"{project_id}.json"
         if project_file.exists():
-            with open(project_file) as f:
-                project = json.load(f)
-            project['photos'].append({
+            append_record(sidecar_path(project_id, 'photos'), {
                 'id': photo_id,
                 'filename': photo_filename,
                 'label': label,
                 'timestamp': datetime.now().isoformat(),
-                'gps': data.get('gps', {})
+                'gps': gps
             })
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
     
-    return jsonify({'success': True, 'photo_id': photo_id})
+    return jsonify({'success': True, 'photo_id': photo_id, 'filename': photo_filename})
 
 @app.route('/api/projects/<project_id>/export', methods=['GET'])
 @login_required
 def export_project(project_id):
     """Export project as JSON"""
     if DATABASE_URL:
-        # For DB, just return the project data
-        return get_project(project_id)
+        doc = load_project_doc(project_id, session.get('user'))
+        if doc is None:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        # Everything but the photos is small - send it first, then stream the
+        # photos (with their image data) so the export never sits in memory
+        project = orjson.loads(doc)
+        del project['photos']
+        head = orjson.dumps(project)[:-1] + b',"photos":['
+        
+        def generate():
+            yield head
+            # Named cursor = server-side cursor, rows arrive in batches of itersize
+            cur = get_db().cursor(name='export_photos', cursor_factory=RealDictCursor)
+            cur.itersize = 20
+            cur.execute('''
+                SELECT id, project_id, label, filename, storage_url, created_at, data
+                FROM photos WHERE project_id = %s ORDER BY created_at
+            ''', (project_id,))
+            sep = b''
+            for photo in cur:
+                photo_bytes = photo['data']
+                if photo_bytes is None and photo['filename']:
+                    # Moved out of the table by migrate-photos
+                    photo_path = PHOTOS_DIR / photo['filename']
+                    photo_bytes = photo_path.read_bytes() if photo_path.is_file() else None
+                if photo_bytes is not None:
+                    photo['data'] = pybase64.b64encode(photo_bytes).decode()
+                yield sep + orjson.dumps(photo)
+                sep = b','
+            cur.close()
+            yield b']}'
+        
+        response = app.response_class(stream_with_context(generate()), mimetype='application/json')
     else:
         project_file = PROJECTS_DIR / f"{project_id}.json"
         if not project_file.exists():
             return jsonify({'error': 'Project not found'}), 404
-        return send_file(project_file, as_attachment=True)
+        response = jsonify(load_project_file(project_id))
+    
+    response.headers['Content-Disposition'] = f'attachment; filename={project_id}.json'
+    return response
 
 @app.route('/photos/<filename>')
 @login_required
 def serve_photo(filename):
     """Serve a photo"""
-    return send_file(PHOTOS_DIR / filename)
+    if DATABASE_URL:
+        # The table says whose photo it is, and holds its bytes unless they
+        # live in PHOTOS_DIR
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('''
+            SELECT ph.data FROM photos ph JOIN projects p ON p.id = ph.project_id
+            WHERE ph.filename = %s AND p.user_email = %s
+        ''', (filename, session.get('user')))
+        row = cur.fetchone()
+        cur.close()
+        if not row:
+            return jsonify({'error': 'Photo not found'}), 404
+        if row[0] is not None:
+            # Filenames are unique and photos never change, so the name is a
+            # stable validator
+            return send_file(io.BytesIO(row[0]), mimetype='image/jpeg', etag=filename, conditional=True)
+    if PHOTOS_ACCEL_PREFIX:
+        if not (PHOTOS_DIR / filename).is_file():
+            return jsonify({'error': 'Photo not found'}), 404
+        return app.response_class(mimetype='image/jpeg', headers={'X-Accel-Redirect': PHOTOS_ACCEL_PREFIX + filename})
+    # Served from a path, so the WSGI server's file wrapper (sendfile) is used
+    return send_from_directory(PHOTOS_DIR, filename, conditional=True)
+
+@app.cli.command('migrate-photos')
+def migrate_photos():
+    """Move photo bytes from the photos table into PHOTOS_DIR.
+
+    Run once by hand (flask --app app migrate-photos), only with PHOTOS_DIR set
+    to persistent storage. Each photo's data is cleared only after its file is
+    written; the column itself is kept.
+    """
+    if not DATABASE_URL or PHOTOS_IN_DB:
+        print("Set DATABASE_URL and PHOTOS_DIR (persistent storage) first")
+        return
+    
+    conn = psycopg2.connect(DATABASE_URL)
+    blobs = conn.cursor(name='migrate_photos')
+    blobs.itersize = 20
+    blobs.execute('SELECT id, filename, data FROM photos WHERE data IS NOT NULL')
+    moved = []
+    for photo_id, filename, data in blobs:
+        with open(PHOTOS_DIR / filename, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        moved.append(photo_id)
+    blobs.close()
+    
+    cur = conn.cursor()
+    cur.execute('UPDATE photos SET data = NULL WHERE id = ANY(%s)', (moved,))
+    conn.commit()
+    cur.close()
+    conn.close()
+    print(f"Moved {len(moved)} photos to {PHOTOS_DIR}")
 
 # Pre-load Rodrigo's project
 def create_rodrigo_project():
@@ -482,8 +864,8 @@ def create_rodrigo_project():
             'notes': ''
         }
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        with open(project_file, 'wb') as f:
+            f.write(orjson.dumps(project))
 
 # Initialize
 create_rodrigo_project()
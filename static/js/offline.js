@@ -248,23 +248,40 @@ async function syncPendingData() {
   let synced = 0;
   let failed = 0;
   
+  // Replay in queue order - a queued PUT rewrites the project's GPS points, so
+  // only back-to-back GPS posts to the same project are merged into one batch
+  const runs = [];
   for (const item of pending) {
+    const isGps = item.action === 'POST' && item.endpoint.endsWith('/gps');
+    const last = runs[runs.length - 1];
+    if (isGps && last && last.gps && last.items[0].endpoint === item.endpoint) {
+      last.items.push(item);
+    } else {
+      runs.push({ gps: isGps, items: [item] });
+    }
+  }
+  
+  for (const run of runs) {
+    const first = run.items[0];
+    const batched = run.gps && run.items.length > 1;
     try {
-      const response = await fetch(item.endpoint, {
-        method: item.action,
+      const response = await fetch(batched ? `${first.endpoint}/batch` : first.endpoint, {
+        method: first.action,
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(item.data)
+        body: JSON.stringify(batched ? { points: run.items.map(item => item.data) } : first.data)
       });
       
       if (response.ok) {
-        await removeFromSyncQueue(item.id);
-        synced++;
+        for (const item of run.items) {
+          await removeFromSyncQueue(item.id);
+        }
+        synced += run.items.length;
       } else {
-        failed++;
+        failed += run.items.length;
       }
     } catch (e) {
-      console.log('[Offline] Sync failed for item:', item.id);
-      failed++;
+      console.log('[Offline] Sync failed for:', batched ? first.endpoint : first.id);
+      failed += run.items.length;
     }
   }
   
@@ -620,39 +620,46 @@ function capturePhoto() {
     input.click();
 }
 
-// Compress image for faster upload and storage
-function compressImage(file, maxWidth = 1600, quality = 0.8) {
+// Draw image onto a canvas, scaled down to maxWidth
+function drawScaledImage(file, maxWidth) {
     return new Promise((resolve) => {
-        const reader = new FileReader();
-        reader.onload = (e) => {
-            const img = new Image();
-            img.onload = () => {
-                const canvas = document.createElement('canvas');
-                let width = img.width;
-                let height = img.height;
-                
-                // Scale down if too large
-                if (width > maxWidth) {
-                    height = Math.round((height * maxWidth) / width);
-                    width = maxWidth;
-                }
-                
-                canvas.width = width;
-                canvas.height = height;
-                
-                const ctx = canvas.getContext('2d');
-                ctx.drawImage(img, 0, 0, width, height);
-                
-                // Convert to compressed JPEG
-                const compressedData = canvas.toDataURL('image/jpeg', quality);
-                resolve(compressedData);
-            };
-            img.src = e.target.result;
+        const url = URL.createObjectURL(file);
+        const img = new Image();
+        img.onload = () => {
+            URL.revokeObjectURL(url);
+            const canvas = document.createElement('canvas');
+            let width = img.width;
+            let height = img.height;
+            
+            // Scale down if too large
+            if (width > maxWidth) {
+                height = Math.round((height * maxWidth) / width);
+                width = maxWidth;
+            }
+            
+            canvas.width = width;
+            canvas.height = height;
+            
+            const ctx = canvas.getContext('2d');
+            ctx.drawImage(img, 0, 0, width, height);
+            resolve(canvas);
         };
-        reader.readAsDataURL(file);
+        img.src = url;
     });
 }
 
+// Compress image for faster upload and storage (data URL, for the offline queue)
+async function compressImage(file, maxWidth = 1600, quality = 0.8) {
+    const canvas = await drawScaledImage(file, maxWidth);
+    return canvas.toDataURL('image/jpeg', quality);
+}
+
+// Compress image to a JPEG Blob for multipart upload - no base64 on the wire
+async function compressImageBlob(file, maxWidth = 1600, quality = 0.8) {
+    const canvas = await drawScaledImage(file, maxWidth);
+    return new Promise((resolve) => canvas.toBlob(resolve, 'image/jpeg', quality));
+}
+
 async function handlePhotoCapture(event) {
     const file = event.target.files[0];
     if (!file) return;
@@ -664,18 +671,17 @@ async function handlePhotoCapture(event) {
     
     try {
         // Compress the image (iPhone photos are 12MP+)
-        const photoData = await compressImage(file, 1600, 0.8);
-        
         if (navigator.onLine) {
+            const photoBlob = await compressImageBlob(file, 1600, 0.8);
+            const formData = new FormData();
+            formData.append('photo', photoBlob, 'photo.jpg');
+            formData.append('label', label);
+            formData.append('gps', JSON.stringify(currentGPS));
+            formData.append('timestamp', new Date().toISOString());
+            
             const response = await fetch(`/api/projects/${projectId}/photo`, {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    photo: photoData,
-                    label: label,
-                    gps: currentGPS,
-                    timestamp: new Date().toISOString()
-                })
+                body: formData
             });
             
             const result = await response.json();
@@ -686,7 +692,7 @@ async function handlePhotoCapture(event) {
                 projectData.photos.push({
                     id: result.photo_id,
                     label: label,
-                    data: photoData
+                    filename: result.filename
                 });
                 
                 updatePhotosList();
@@ -696,6 +702,7 @@ async function handlePhotoCapture(event) {
             }
         } else {
             // Offline - save locally and queue
+            const photoData = await compressImage(file, 1600, 0.8);
             if (window.OfflineManager) {
                 await window.OfflineManager.savePhotoLocal(projectId, photoData, label);
                 await window.OfflineManager.addToSyncQueue('POST', `/api/projects/${projectId}/photo`, {
@@ -1,5 +1,5 @@
 // Service Worker for Offline Support
-const CACHE_NAME = 'field-app-v1';
+const CACHE_NAME = 'field-app-v3';
 const TILE_CACHE = 'map-tiles-v1';
 const DATA_CACHE = 'project-data-v1';
 